@@ -3,36 +3,12 @@
 # Examples: python3 local_runner.py sample/01.txt -- ./baseline
 #           python3 local_runner.py sample/01.txt sample/01_baseline.txt -- python3 my_solution.py
 
-from collections import defaultdict, namedtuple
 from subprocess import Popen, PIPE
 from sys import argv, exit
 
 
-VMType = namedtuple('VMType', 'numas cpu mem')
-Placement = namedtuple('Placement', 'net rack rack_global pm pm_global numa1 numa2 partition')
-VM = namedtuple('VM', 'type_id pg_id placement')
-
-
-class NUMA:
-    def __init__(self, cpu, mem):
-        self.cpu_total = cpu
-        self.mem_total = mem
-        self.cpu_used = 0
-        self.mem_used = 0
-
-    def allocate(self, vmtype):
-        self.cpu_used += vmtype.cpu
-        self.mem_used += vmtype.mem
-        assert self.cpu_used <= self.cpu_total, 'NUMA CPU capacity exceeded!'
-        assert self.mem_used <= self.mem_total, 'NUMA memory capacity exceeded!'
-
-    def release(self, vmtype):
-        self.cpu_used -= vmtype.cpu
-        self.mem_used -= vmtype.mem
-
-
 class PG:
-    def __init__(self, rack_aa, host_aa, net_a, rack_a):
+    def __init__(self, rack_aa, host_aa, net_a, rack_a, n_net, n_rack, n_pm):
         self.rack_aa = rack_aa
         self.host_aa = host_aa
         self.net_a = net_a
@@ -40,12 +16,15 @@ class PG:
 
         assert rack_aa == 0 or rack_a == 0, "Placement group can't have both rack antiaffinity and affinity!"
         
-        self.rack_partition = {}
-        self.rack_vm_count = defaultdict(int)
-        self.host_vm_count = defaultdict(int)
-        self.net_vm_count = defaultdict(int)
-        self.group_net_domain = set()
-        self.group_rack_id = set()
+        # Counters are only allocated for the constraints this group has
+        has_rack = rack_aa > 0 or rack_a > 0
+        self.rack_partition = [0] * (n_net * n_rack) if rack_aa > 0 else None
+        self.rack_vm_count = [0] * (n_net * n_rack) if has_rack else None
+        self.host_vm_count = [0] * (n_net * n_rack * n_pm) if host_aa > 0 else None
+        self.net_vm_count = [0] * n_net if net_a > 0 else None
+        # Bitmasks of the networks and racks the group's VMs are in
+        self.group_net_mask = 0
+        self.group_rack_mask = 0
 
     def has_soft_constraints(self):
         return self.host_aa > 0 or self.net_a == 1 or self.rack_a == 1
@@ -53,47 +32,43 @@ class PG:
     def host_ok(self, idx):
         return self.host_aa == 0 or self.host_vm_count[idx] <= self.host_aa
         
-    def new_placement(self, placement, req_id):
+    def new_placement(self, net, rack_global, pm_global, partition, req_id):
         ok = True
         if self.rack_aa > 0:
-            rack_id = placement.rack_global
-            partition = placement.partition
-            if self.rack_vm_count[rack_id] > 0:
-                cur_partition = self.rack_partition[rack_id]
+            if self.rack_vm_count[rack_global] > 0:
+                cur_partition = self.rack_partition[rack_global]
                 assert cur_partition == partition, "Rack antiaffinity violated (request #{})!".format(req_id)
-                self.rack_vm_count[rack_id] += 1
+                self.rack_vm_count[rack_global] += 1
             else:
-                self.rack_partition[rack_id] = partition
-                self.rack_vm_count[rack_id] = 1
+                self.rack_partition[rack_global] = partition
+                self.rack_vm_count[rack_global] = 1
         if self.host_aa > 0:
-            self.host_vm_count[placement.pm_global] += 1
+            self.host_vm_count[pm_global] += 1
         if self.net_a > 0:
-            net = placement.net
             self.net_vm_count[net] += 1
-            self.group_net_domain.add(net)
-            if len(self.group_net_domain) > 1:
+            self.group_net_mask |= 1 << net
+            if self.group_net_mask & (self.group_net_mask - 1):
                 ok = False
                 assert self.net_a != 2, "Hard network affinity violated (request #{})!".format(req_id)
         if self.rack_a > 0:
-            rack = placement.rack_global
-            self.rack_vm_count[rack] += 1
-            self.group_rack_id.add(rack)
-            if len(self.group_rack_id) > 1:
+            self.rack_vm_count[rack_global] += 1
+            self.group_rack_mask |= 1 << rack_global
+            if self.group_rack_mask & (self.group_rack_mask - 1):
                 ok = False
                 assert self.rack_a != 2, "Hard rack affinity violated (request #{})!".format(req_id)
         return ok
 
-    def delete_placement(self, placement):
+    def delete_placement(self, net, rack_global, pm_global):
         if self.rack_aa > 0 or self.rack_a > 0:
-            self.rack_vm_count[placement.rack_global] -= 1
+            self.rack_vm_count[rack_global] -= 1
         if self.host_aa > 0:
-            self.host_vm_count[placement.pm_global] -= 1
+            self.host_vm_count[pm_global] -= 1
         if self.net_a > 0:
-            self.net_vm_count[placement.net] -= 1
-            if self.net_vm_count[placement.net] == 0:
-                self.group_net_domain.remove(placement.net)
-        if self.rack_a > 0 and self.rack_vm_count[placement.rack_global] == 0:
-            self.group_rack_id.remove(placement.rack_global)
+            self.net_vm_count[net] -= 1
+            if self.net_vm_count[net] == 0:
+                self.group_net_mask &= ~(1 << net)
+        if self.rack_a > 0 and self.rack_vm_count[rack_global] == 0:
+            self.group_rack_mask &= ~(1 << rack_global)
 
 
 def end_interaction(participant, placed, soft_fulfilled, soft_total, finished, baseline_score):
@@ -118,68 +93,87 @@ def end_interaction(participant, placed, soft_fulfilled, soft_total, finished, b
 
 def interact(input_name, participant_run_cmd, baseline_score):
     with open(input_name, 'r') as f:
+        next_line = iter(f.read().splitlines()).__next__
         participant = Popen(participant_run_cmd, stdin=PIPE, stdout=PIPE, text=True, encoding='utf-8')
-        n_net, n_rack, n_pm, n_numa = list(map(int, f.readline().rstrip('\r\n').split(' ')))
-        participant.stdin.write('{} {} {} {}\n'.format(n_net, n_rack, n_pm, n_numa))
+        read_response = participant.stdout.readline
+        n_net, n_rack, n_pm, n_numa = list(map(int, next_line().split()))
+        header = ['{} {} {} {}'.format(n_net, n_rack, n_pm, n_numa)]
         numa_cpu = []
         numa_mem = []
         for _ in range(n_numa):
-            cpu, mem = list(map(int, f.readline().rstrip('\r\n').split(' ')))
+            cpu, mem = list(map(int, next_line().split()))
             numa_cpu.append(cpu)
             numa_mem.append(mem)
-            participant.stdin.write('{} {}\n'.format(cpu, mem))
-        numa = []
-        for _ in range(n_net):
-            net_numa = []
-            for _ in range(n_rack):
-                rack_numa = []
-                for _ in range(n_pm):
-                    pm_numa = []
-                    for i in range(n_numa):
-                        pm_numa.append(NUMA(numa_cpu[i], numa_mem[i]))
-                    rack_numa.append(pm_numa)
-                net_numa.append(rack_numa)
-            numa.append(net_numa)
-        n_types = int(f.readline().rstrip('\r\n'))
-        participant.stdin.write('{}\n'.format(n_types))
-        types = []
+            header.append('{} {}'.format(cpu, mem))
+        # NUMA usage is stored flat, indexed by pm_global * n_numa + numa
+        cpu_total = numa_cpu * (n_net * n_rack * n_pm)
+        mem_total = numa_mem * (n_net * n_rack * n_pm)
+        cpu_used = [0] * len(cpu_total)
+        mem_used = [0] * len(mem_total)
+        n_types = int(next_line())
+        header.append(str(n_types))
+        type_numas = []
+        type_cpu = []
+        type_mem = []
         for _ in range(n_types):
-            nc, cpu, mem = list(map(int, f.readline().rstrip('\r\n').split(' ')))
-            participant.stdin.write('{} {} {}\n'.format(nc, cpu, mem))
-            types.append(VMType(nc, cpu, mem))
+            nc, cpu, mem = list(map(int, next_line().split()))
+            header.append('{} {} {}'.format(nc, cpu, mem))
+            type_numas.append(nc)
+            type_cpu.append(cpu)
+            type_mem.append(mem)
+        participant.stdin.write('\n'.join(header) + '\n')
         participant.stdin.flush()
         req_id = 0
         pgs = []
-        vms = []
+        # VM state is stored column-wise, indexed by VM id - 1
+        vm_type_id = []
+        vm_pg_id = []
+        vm_net = []
+        vm_rack_global = []
+        vm_pm_global = []
+        # Indices into the NUMA tables, -1 for the second NUMA of 1-NUMA VMs
+        vm_numa1 = []
+        vm_numa2 = []
         placed = 0
         soft_fulfilled = 0
         soft_total = 0
         while True:
             req_id += 1
-            req_type = int(f.readline().rstrip('\r\n'))
-            participant.stdin.write('{}\n'.format(req_type))
+            req_type = int(next_line())
+            request = [str(req_type)]
             if req_type == 1:
-                data = list(map(int, f.readline().rstrip('\r\n').split(' ')))
-                participant.stdin.write(' '.join(list(map(str, data))) + '\n')
-                data += list(map(int, f.readline().rstrip('\r\n').split(' ')))
-                participant.stdin.write(' '.join(list(map(str, data[3:]))) + '\n')
+                data = list(map(int, next_line().split()))
+                request.append(' '.join(list(map(str, data))))
+                data += list(map(int, next_line().split()))
+                request.append(' '.join(list(map(str, data[3:]))))
+                participant.stdin.write('\n'.join(request) + '\n')
                 participant.stdin.flush()
-                pgs.append(PG(data[1], data[2], data[3], data[4]))
+                pgs.append(PG(data[1], data[2], data[3], data[4], n_net, n_rack, n_pm))
             elif req_type == 2:
-                l, fl, g, p = list(map(int, f.readline().rstrip('\r\n').split(' ')))
-                participant.stdin.write('{} {} {} {}\n'.format(l, fl, g, p))
-                ids = list(map(int, f.readline().rstrip('\r\n').split(' ')))
+                l, fl, g, p = list(map(int, next_line().split()))
+                request.append('{} {} {} {}'.format(l, fl, g, p))
+                ids = list(map(int, next_line().split()))
                 assert len(ids) == l
-                participant.stdin.write(' '.join(list(map(str, ids))) + '\n')
+                request.append(' '.join(list(map(str, ids))))
+                participant.stdin.write('\n'.join(request) + '\n')
                 participant.stdin.flush()
+                type_id = fl - 1
+                pg_id = g - 1
+                vt_numas = type_numas[type_id]
+                vt_cpu = type_cpu[type_id]
+                vt_mem = type_mem[type_id]
+                pg = pgs[pg_id]
+                new_placement = pg.new_placement
+                pg_has_soft = pg.has_soft_constraints()
                 soft_ok = True
+                placed_pms = []
                 for i in range(l):
-                    line = participant.stdout.readline().rstrip(' \r\n')
+                    line = read_response().rstrip(' \r\n')
                     if line == '-1':
                         assert i == 0, 'Partial placements are forbidden!'
                         end_interaction(participant, placed, soft_fulfilled, soft_total, False, baseline_score)
                         return
-                    tokens = list(map(int, line.split(' ')))
+                    tokens = list(map(int, line.split()))
                     net = -1
                     rack = -1
                     pm = -1
@@ -193,28 +187,39 @@ def interact(input_name, participant_run_cmd, baseline_score):
                         assert len(tokens) == 5
                         numa_count = 2
                         net, rack, pm, numa1, numa2 = tokens
-                        assert 0 < numa2 and numa2 <= n_numa
+                        assert 0 < numa2 <= n_numa
                         assert numa1 != numa2, '2-NUMA VMs must be placed on different NUMAs!'
-                    assert numa_count == types[fl - 1].numas, 'Wrong number of NUMAs in the output!'
-                    assert 0 < net and net <= n_net
-                    assert 0 < rack and rack <= n_rack
-                    assert 0 < pm and pm <= n_pm
-                    assert 0 < numa1 and numa1 <= n_numa
+                    assert numa_count == vt_numas, 'Wrong number of NUMAs in the output!'
+                    assert 0 < net <= n_net
+                    assert 0 < rack <= n_rack
+                    assert 0 < pm <= n_pm
+                    assert 0 < numa1 <= n_numa
                     net -= 1
-                    rack -= 1
-                    pm -= 1
-                    numa1 -= 1
+                    rack_global = rack - 1 + net * n_rack
+                    pm_global = pm - 1 + n_pm * rack_global
+                    numa1 += pm_global * n_numa - 1
                     if numa2 != -1:
-                        numa2 -= 1
+                        numa2 += pm_global * n_numa - 1
                     partition = i if p == -1 else p - 1
-                    place = Placement(net, rack, rack + net * n_rack, pm, pm + n_pm * (rack + net * n_rack), numa1, numa2, partition)
-                    vm = VM(fl - 1, g - 1, place)
-                    vms.append(vm)
-                    numa[net][rack][pm][numa1].allocate(types[fl - 1])
+                    vm_type_id.append(type_id)
+                    vm_pg_id.append(pg_id)
+                    vm_net.append(net)
+                    vm_rack_global.append(rack_global)
+                    vm_pm_global.append(pm_global)
+                    vm_numa1.append(numa1)
+                    vm_numa2.append(numa2)
+                    cpu_used[numa1] += vt_cpu
+                    mem_used[numa1] += vt_mem
+                    assert cpu_used[numa1] <= cpu_total[numa1], 'NUMA CPU capacity exceeded!'
+                    assert mem_used[numa1] <= mem_total[numa1], 'NUMA memory capacity exceeded!'
                     if numa2 != -1:
-                        numa[net][rack][pm][numa2].allocate(types[fl - 1])
-                    status = pgs[g - 1].new_placement(place, req_id)
-                    if pgs[g - 1].has_soft_constraints():
+                        cpu_used[numa2] += vt_cpu
+                        mem_used[numa2] += vt_mem
+                        assert cpu_used[numa2] <= cpu_total[numa2], 'NUMA CPU capacity exceeded!'
+                        assert mem_used[numa2] <= mem_total[numa2], 'NUMA memory capacity exceeded!'
+                    status = new_placement(net, rack_global, pm_global, partition, req_id)
+                    placed_pms.append(pm_global)
+                    if pg_has_soft:
                         soft_total += 1
                         if not status:
                             soft_ok = False
@@ -222,25 +227,33 @@ def interact(input_name, participant_run_cmd, baseline_score):
                         soft_ok = False
                 placed += l
                 if soft_ok:
-                    if pgs[g - 1].host_aa > 0:
-                        for i in range(len(vms) - l, len(vms)):
-                            if pgs[g - 1].host_ok(vms[i].placement.pm_global):
+                    if pg.host_aa > 0:
+                        # Checked after the whole request is placed, as later VMs may share a host
+                        for pm_global in placed_pms:
+                            if pg.host_ok(pm_global):
                                 soft_fulfilled += 1
                     else:
                         soft_fulfilled += l
             elif req_type == 3:
-                ids = list(map(int, f.readline().rstrip('\r\n').split(' ')))
-                participant.stdin.write(' '.join(list(map(str, ids))) + '\n')
+                ids = list(map(int, next_line().split()))
+                request.append(' '.join(list(map(str, ids))))
+                participant.stdin.write('\n'.join(request) + '\n')
                 participant.stdin.flush()
                 ids = ids[1:]
                 for i in ids:
-                    vm = vms[i - 1]
-                    p = vm.placement
-                    pgs[vm.pg_id].delete_placement(p)
-                    numa[p.net][p.rack][p.pm][p.numa1].release(types[vm.type_id])
-                    if p.numa2 != -1:
-                        numa[p.net][p.rack][p.pm][p.numa2].release(types[vm.type_id])
+                    i -= 1
+                    pgs[vm_pg_id[i]].delete_placement(vm_net[i], vm_rack_global[i], vm_pm_global[i])
+                    cpu = type_cpu[vm_type_id[i]]
+                    mem = type_mem[vm_type_id[i]]
+                    numa1 = vm_numa1[i]
+                    numa2 = vm_numa2[i]
+                    cpu_used[numa1] -= cpu
+                    mem_used[numa1] -= mem
+                    if numa2 != -1:
+                        cpu_used[numa2] -= cpu
+                        mem_used[numa2] -= mem
             else:
+                participant.stdin.write('\n'.join(request) + '\n')
                 try:
                     participant.stdin.flush()
                 except:
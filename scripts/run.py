@@ -1,29 +1,38 @@
 import hcr
+import os
 import sys
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent.parent
+BUILD_DIRECTORY = PROJECT_ROOT / "cmake-build-release"
+RUNNER = str(PROJECT_ROOT / "scripts" / "local_runner.py")
+INPUT_DIRECTORY = PROJECT_ROOT / "scripts" / "input"
 
-solvers = sorted([file.stem for file in (PROJECT_ROOT / "cmake-build-release").iterdir() if file.is_file() and file.name.startswith("v")])
+with os.scandir(BUILD_DIRECTORY) as entries:
+    solvers = sorted([Path(entry.name).stem for entry in entries if entry.name.startswith("v") and entry.is_file()])
 default_seeds = list(range(1, 12))
 is_maximizing = True
 results_directory = PROJECT_ROOT / "results"
 
 def run_solver(solver: str, input: int) -> hcr.Output:
+    input_file = str(INPUT_DIRECTORY / f"{input:02}")
     return hcr.run_process([sys.executable,
-                            PROJECT_ROOT / "scripts" / "local_runner.py",
-                            PROJECT_ROOT / "scripts" / "input" / f"{input:02}",
-                            PROJECT_ROOT / "scripts" / "input" / f"{input:02}.a",
+                            RUNNER,
+                            input_file,
+                            f"{input_file}.a",
                             "--",
-                            PROJECT_ROOT / "cmake-build-release" / solver],
+                            str(BUILD_DIRECTORY / solver)],
                             timeout=15)
 
 def get_score(output: hcr.Output) -> float:
-    for line in reversed(output.stdout.splitlines()):
-        if line.startswith("Solution score = "):
-            return float(line.split(" = ")[1])
+    stdout = output.stdout
+    start = stdout.rfind("\nSolution score = ") + 1
+    if start == 0 and not stdout.startswith("Solution score = "):
+        return 0.0
 
-    return 0.0
+    end = stdout.find("\n", start)
+    line = stdout[start:end] if end != -1 else stdout[start:]
+    return float(line.split(" = ")[1])
 
 if __name__ == "__main__":
     hcr.cli(solvers, default_seeds, is_maximizing, results_directory, get_score, run_solver=run_solver)